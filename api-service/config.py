@@ -42,6 +42,7 @@ class Settings(BaseSettings):
     # API Configuration - Railway uses dynamic PORT
     api_port: int = int(os.environ.get("PORT", 8000))
     api_host: str = "0.0.0.0"
+    batch_concurrency: int = 4  # Batch items answered at once across all /ask/batch requests
     
     class Config:
         env_file = ".env"
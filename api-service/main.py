@@ -92,7 +92,8 @@ def create_app():
     # Create API
     api = WoWAPI(
         answer_question_use_case=answer_question_use_case,
-        system_status_use_case=system_status_use_case
+        system_status_use_case=system_status_use_case,
+        batch_concurrency=settings.batch_concurrency
     )
     
     logger.info("WoW API Service initialized successfully")
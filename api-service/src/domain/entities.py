@@ -1,10 +1,10 @@
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class QuestionRequest(BaseModel):
-    question: str
+    question: str = Field(min_length=1)
     user_id: str
     username: str
     channel_id: str
@@ -12,6 +12,10 @@ class QuestionRequest(BaseModel):
     timestamp: datetime = datetime.now()
 
 
+class BatchQuestionRequest(BaseModel):
+    requests: List[QuestionRequest] = Field(min_length=1, max_length=20)
+
+
 class WoWArticle(BaseModel):
     id: str
     title: str
@@ -1,8 +1,9 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.responses import JSONResponse
+import asyncio
 import structlog
-from typing import Dict, Any
-from ..domain.entities import QuestionRequest, AIResponse
+from typing import Dict, Any, List
+from ..domain.entities import QuestionRequest, BatchQuestionRequest, AIResponse
 from ..application.use_cases import AnswerWoWQuestionUseCase, GetSystemStatusUseCase, WoWQuestionProcessingError
 
 logger = structlog.get_logger()
@@ -12,7 +13,8 @@ class WoWAPI:
     def __init__(
         self,
         answer_question_use_case: AnswerWoWQuestionUseCase,
-        system_status_use_case: GetSystemStatusUseCase
+        system_status_use_case: GetSystemStatusUseCase,
+        batch_concurrency: int = 4
     ):
         self.app = FastAPI(
             title="WoW Actuality API",
@@ -21,9 +23,41 @@ class WoWAPI:
         )
         self.answer_question_use_case = answer_question_use_case
         self.system_status_use_case = system_status_use_case
+        # Shared by all batch requests, so one large batch can't flood the AI backend
+        self._batch_semaphore = asyncio.Semaphore(batch_concurrency)
         
         self._setup_routes()
 
+    @staticmethod
+    def _format_response(response: AIResponse) -> Dict[str, Any]:
+        return {
+            "response": response.content,
+            "source_articles": response.source_articles,
+            "confidence": response.confidence,
+            "timestamp": response.timestamp.isoformat()
+        }
+
+    async def _answer_batch_item(self, request: QuestionRequest) -> Dict[str, Any]:
+        try:
+            async with self._batch_semaphore:
+                response = await self.answer_question_use_case.execute(request)
+            return {"ok": True, **self._format_response(response)}
+        except WoWQuestionProcessingError as e:
+            logger.error(
+                "Question processing error",
+                user_id=request.user_id,
+                error=str(e)
+            )
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            logger.error(
+                "Unexpected error in batch ask item",
+                user_id=request.user_id,
+                error=str(e),
+                exc_info=True
+            )
+            return {"ok": False, "error": "Internal server error"}
+
     def _setup_routes(self):
         @self.app.post("/ask", response_model=Dict[str, Any])
         async def ask_question(request: QuestionRequest):
@@ -37,12 +71,7 @@ class WoWAPI:
             try:
                 response = await self.answer_question_use_case.execute(request)
                 
-                return {
-                    "response": response.content,
-                    "source_articles": response.source_articles,
-                    "confidence": response.confidence,
-                    "timestamp": response.timestamp.isoformat()
-                }
+                return self._format_response(response)
                 
             except WoWQuestionProcessingError as e:
                 logger.error(
@@ -61,6 +90,15 @@ class WoWAPI:
                 )
                 raise HTTPException(status_code=500, detail="Internal server error")
 
+        @self.app.post("/ask/batch", response_model=List[Dict[str, Any]])
+        async def ask_questions_batch(batch: BatchQuestionRequest):
+            """Answer several questions in one round-trip; failures are reported per item"""
+            logger.info("Received batch ask request", batch_size=len(batch.requests))
+            
+            return await asyncio.gather(*(
+                self._answer_batch_item(request) for request in batch.requests
+            ))
+
         @self.app.get("/health")
         async def health_check():
             try:
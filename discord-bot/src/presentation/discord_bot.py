@@ -98,7 +98,7 @@ class WoWCog(commands.Cog):
             
             # Truncate if too long for Discord
             if len(response_text) > self.bot.max_response_length:
-                response_text = response_text[:self.bot.max_response_length - 3] + "..."
+                response_text = f"{response_text[:self.bot.max_response_length - 3]}..."
             
             # Add source information if available
             if response.source_articles:
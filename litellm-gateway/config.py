@@ -6,13 +6,17 @@ Environment variables and security patterns
 import os
 import re
 from datetime import timedelta
-from typing import List, Pattern
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Pattern, TextIO
+
+import yaml
 
 # Environment configuration
 MASTER_KEY = os.getenv("LITELLM_MASTER_KEY", "your_master_key")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+SECURITY_CONFIG_PATH = Path(__file__).parent / "config.yaml"
 
 # Rate limiting configuration
 RATE_LIMIT_REQUESTS = 60
@@ -21,10 +25,10 @@ RATE_LIMIT_WINDOW = timedelta(minutes=1)
 # Security patterns for prompt injection detection
 INJECTION_PATTERNS = [
     # Direct injection attempts
-    r"(?i)ignore\s+(all\s+)?previous\s+instructions",
-    r"(?i)forget\s+(all\s+)?previous\s+instructions",
-    r"(?i)disregard\s+(all\s+)?previous\s+instructions",
-    r"(?i)override\s+(all\s+)?previous\s+instructions",
+    r"(?i)ignore\s+(all\s+)?(previous\s+)?instructions",
+    r"(?i)forget\s+(all\s+)?(previous\s+)?instructions",
+    r"(?i)disregard\s+(all\s+)?(previous\s+)?instructions",
+    r"(?i)override\s+(all\s+)?(previous\s+)?instructions",
     
     # Role manipulation
     r"(?i)you\s+are\s+now\s+(a\s+)?different",
@@ -54,6 +58,28 @@ INJECTION_PATTERNS = [
     r"<\|.*?\|>",
     r"(?i)\\n\\n.*ignore",
     r"(?i)system:",
+
+    # Markup injection attempts
+    r"(?i)<\s*script\b",
 ]
 
-COMPILED_PATTERNS: List[Pattern] = [re.compile(pattern) for pattern in INJECTION_PATTERNS]
\ No newline at end of file
+COMPILED_PATTERNS: List[Pattern] = [re.compile(pattern) for pattern in INJECTION_PATTERNS]
+
+
+def _scoped(pattern: str) -> str:
+    """Turn a leading global (?i) flag into a scoped group so patterns can be joined"""
+    if pattern.startswith("(?i)"):
+        return f"(?i:{pattern[4:]})"
+    return f"(?:{pattern})"
+
+
+# All patterns as one alternation, so clean text is rejected in a single scan
+COMBINED_PATTERN: Pattern = re.compile("|".join(_scoped(p) for p in INJECTION_PATTERNS))
+
+
+def load_security_patterns(source: Optional[TextIO] = None) -> Dict[str, Any]:
+    """Parse the gateway YAML config from source, or from SECURITY_CONFIG_PATH"""
+    if source is not None:
+        return yaml.safe_load(source) or {}
+    with open(SECURITY_CONFIG_PATH) as f:
+        return yaml.safe_load(f) or {}
@@ -9,7 +9,7 @@ from fastapi import HTTPException
 from litellm import completion
 
 from models import ChatCompletionRequest
-from security import SecurityMiddleware, get_security_alerts, get_security_config
+from security import get_security_alerts, get_security_config
 
 logger = structlog.get_logger()
 
@@ -57,20 +57,7 @@ async def chat_completions(request: ChatCompletionRequest, client_host: str):
     request_id = f"chat_{datetime.utcnow().timestamp()}"
     
     try:
-        # Security check: Detect prompt injection in user messages
-        for message in request.messages:
-            if message.role == "user":
-                injection_pattern = SecurityMiddleware.detect_prompt_injection(message.content)
-                if injection_pattern:
-                    SecurityMiddleware.log_security_alert(
-                        "HIGH",
-                        f"Prompt injection detected: {injection_pattern}",
-                        request_id
-                    )
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Request blocked due to security policy violation"
-                    )
+        # User messages were already screened for prompt injection by SecurityMiddleware
         
         # Convert messages to LiteLLM format
         litellm_messages = [
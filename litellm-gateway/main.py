@@ -6,11 +6,10 @@ Provides secure LLM access with monitoring and security middleware
 
 import os
 import logging
-from datetime import datetime
 
 import uvicorn
 import structlog
-from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import litellm
 
@@ -66,33 +65,8 @@ app.add_middleware(
 )
 
 
-@app.middleware("http")
-async def security_middleware(request: Request, call_next):
-    """Apply security checks to all requests"""
-    request_id = f"req_{datetime.utcnow().timestamp()}"
-    client_id = request.client.host if request.client else "unknown"
-    
-    # Rate limiting
-    if not SecurityMiddleware.check_rate_limit(client_id):
-        SecurityMiddleware.log_security_alert(
-            "HIGH",
-            f"Rate limit exceeded for client {client_id}",
-            request_id
-        )
-        raise HTTPException(
-            status_code=429,
-            detail="Rate limit exceeded. Please try again later."
-        )
-    
-    response = await call_next(request)
-    
-    # Add security headers
-    response.headers["X-Request-ID"] = request_id
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    
-    return response
+# Rate limiting, prompt injection blocking and security headers
+app.add_middleware(SecurityMiddleware)
 
 
 # Route definitions
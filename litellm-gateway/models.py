@@ -4,12 +4,12 @@ Data models and validation schemas
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
 class ChatMessage(BaseModel):
-    role: str = Field(..., description="Message role: system, user, or assistant")
+    role: Literal["system", "user", "assistant"] = Field(..., description="Message role: system, user, or assistant")
     content: str = Field(..., description="Message content")
 
 
@@ -25,4 +25,9 @@ class SecurityAlert(BaseModel):
     level: str
     message: str
     timestamp: datetime
-    request_id: str
\ No newline at end of file
+    request_id: str
+
+
+class InjectionFilterResult(BaseModel):
+    is_safe: bool
+    detected_patterns: List[str] = Field(default_factory=list)
\ No newline at end of file
@@ -3,13 +3,18 @@ Security middleware and utilities for LiteLLM Gateway
 Prompt injection detection and rate limiting
 """
 
+import json
 import structlog
 from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
 
-from config import COMPILED_PATTERNS, RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW
-from models import SecurityAlert
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from config import COMBINED_PATTERN, COMPILED_PATTERNS, RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW
+from models import InjectionFilterResult, SecurityAlert
 
 logger = structlog.get_logger()
 
@@ -51,18 +56,69 @@ class ErrorTracker:
 error_tracker = ErrorTracker()
 
 
-class SecurityMiddleware:
+class SecurityMiddleware(BaseHTTPMiddleware):
     """Security middleware for prompt injection detection and rate limiting"""
     
+    async def dispatch(self, request: Request, call_next):
+        """Apply rate limiting and prompt injection checks to every request"""
+        request_id = f"req_{datetime.utcnow().timestamp()}"
+        client_id = request.client.host if request.client else "unknown"
+        
+        if not self.check_rate_limit(client_id):
+            self.log_security_alert(
+                "HIGH",
+                f"Rate limit exceeded for client {client_id}",
+                request_id
+            )
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded. Please try again later."}
+            )
+        
+        if request.method == "POST":
+            injection_pattern = self.detect_body_injection(await request.body())
+            if injection_pattern:
+                self.log_security_alert(
+                    "HIGH",
+                    f"Prompt injection detected: {injection_pattern}",
+                    request_id
+                )
+                return JSONResponse(
+                    status_code=400,
+                    content={"detail": "Request blocked due to security violation"}
+                )
+        
+        response = await call_next(request)
+        
+        # Add security headers
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        
+        return response
+    
     @staticmethod
-    def detect_prompt_injection(text: str) -> Optional[str]:
+    def detect_body_injection(body: bytes) -> Optional[str]:
         """
-        Detect potential prompt injection attempts
-        Returns the matched pattern if injection detected, None otherwise
+        Detect prompt injection in the user messages of a chat request body
+        Returns the first matched pattern, None for clean or non-chat bodies
         """
-        for pattern in COMPILED_PATTERNS:
-            if pattern.search(text):
-                return pattern.pattern
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        
+        for message in payload.get("messages") or []:
+            if not isinstance(message, dict) or message.get("role") != "user":
+                continue
+            content = message.get("content")
+            if isinstance(content, str):
+                result = prompt_injection_filter(content)
+                if not result.is_safe:
+                    return result.detected_patterns[0]
         return None
     
     @staticmethod
@@ -111,6 +167,19 @@ class SecurityMiddleware:
         )
 
 
+def prompt_injection_filter(text: str) -> InjectionFilterResult:
+    """Check text against every injection pattern and report all matches"""
+    if not COMBINED_PATTERN.search(text):
+        return InjectionFilterResult(is_safe=True)
+    detected = [pattern.pattern for pattern in COMPILED_PATTERNS if pattern.search(text)]
+    return InjectionFilterResult(is_safe=not detected, detected_patterns=detected)
+
+
+def filter_batch(prompts: List[str]) -> List[InjectionFilterResult]:
+    """Run prompt_injection_filter over several prompts in one call"""
+    return [prompt_injection_filter(prompt) for prompt in prompts]
+
+
 def get_security_alerts() -> List[SecurityAlert]:
     """Get recent security alerts"""
     return security_alerts[-50:]
@@ -31,6 +31,7 @@ ALL_TESTS="unit or integration or e2e"
 TEST_TYPE="unit"
 COVERAGE=false
 VERBOSE=false
+PARALLEL=false
 SERVICES_REQUIRED=false
 CLEANUP_AFTER=false
 
@@ -48,6 +49,7 @@ usage() {
     echo "Options:"
     echo "  -c, --coverage      Generate test coverage report"
     echo "  -v, --verbose       Verbose output"
+    echo "  -p, --parallel      Run tests across all CPU cores (pytest-xdist)"
     echo "  -s, --start-services Start services before testing"
     echo "  -k, --cleanup       Cleanup after tests"
     echo "  -h, --help          Show this help message"
@@ -56,6 +58,7 @@ usage() {
     echo "  $0 unit"
     echo "  $0 integration -s"
     echo "  $0 e2e --start-services --cleanup"
+    echo "  $0 e2e -p"
     echo "  $0 all -c -v"
 }
 
@@ -237,6 +240,16 @@ run_tests() {
         PYTEST_ARGS+=("-v" "-s")
     fi
     
+    # Shard tests across worker processes if requested
+    if [ "$PARALLEL" = true ]; then
+        if [ "$test_type" = "e2e" ]; then
+            # E2E workflows share no state; a few workers keep load on the live stack bounded
+            PYTEST_ARGS+=("-n" "4" "--dist=load")
+        else
+            PYTEST_ARGS+=("-n" "auto")
+        fi
+    fi
+    
     # Run pytest
     if pytest "${PYTEST_ARGS[@]}"; then
         log_success "$test_type tests passed"
@@ -309,6 +322,10 @@ main() {
                 VERBOSE=true
                 shift
                 ;;
+            -p|--parallel)
+                PARALLEL=true
+                shift
+                ;;
             -s|--start-services)
                 SERVICES_REQUIRED=true
                 shift
@@ -8,17 +8,39 @@ import os
 import logging
 from datetime import datetime
 from pathlib import Path
+from typing import BinaryIO, List, Optional
 from structlog.stdlib import LoggerFactory
 import structlog
 
-from .processors import (
-    add_service_context,
-    add_error_tracking_processor,
-    add_request_context_processor,
-    add_performance_tracking_processor
-)
+from .processors import add_fused_context_processor, make_json_bytes_renderer
 from .tracking import ErrorTracker
 
+_NOISY_LOGGERS = frozenset({
+    'discord', 'aiohttp', 'urllib3', 'chromadb', 'httpx',
+    'langchain', 'google', 'openai', 'anthropic'
+})
+_VERY_NOISY_LOGGERS = frozenset({'discord', 'aiohttp'})
+
+# JSON log file shared across reconfigurations, so each configure call does not leak a handle
+_json_log_file: Optional[BinaryIO] = None
+# Error tracker from the last configure call, closed when a new one replaces it
+_error_tracker: Optional[ErrorTracker] = None
+
+
+class _TeeBinaryFile:
+    """Write rendered log lines to several binary streams"""
+    
+    def __init__(self, streams: List[BinaryIO]):
+        self._streams = streams
+    
+    def write(self, data: bytes) -> None:
+        for stream in self._streams:
+            stream.write(data)
+    
+    def flush(self) -> None:
+        for stream in self._streams:
+            stream.flush()
+
 
 def configure_enhanced_logging(
     service_name: str,
@@ -31,58 +53,60 @@ def configure_enhanced_logging(
     enable_performance_tracking: bool = True
 ) -> ErrorTracker:
     """Configure enhanced structured logging for a service"""
+    global _error_tracker
     
     log_path = Path(log_dir)
     log_path.mkdir(exist_ok=True)
     
-    error_tracker = None
+    if _error_tracker is not None:
+        _error_tracker.close()
+        _error_tracker = None
     if enable_error_tracking:
-        error_tracker = ErrorTracker(service_name, log_dir)
+        _error_tracker = ErrorTracker(service_name, log_dir)
+    error_tracker = _error_tracker
     
+    json_format = log_format.lower() == "json"
     processors = [
-        structlog.contextvars.merge_contextvars,
-        add_service_context(service_name, version),
-        add_request_context_processor(),
-    ]
-    
-    if enable_error_tracking and error_tracker:
-        processors.append(add_error_tracking_processor(error_tracker))
-    
-    if enable_performance_tracking:
-        processors.append(add_performance_tracking_processor())
-    
-    processors.extend([
+        add_fused_context_processor(
+            service_name, version, error_tracker, enable_performance_tracking,
+            include_service_context=not json_format
+        ),
         structlog.processors.add_log_level,
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
         structlog.processors.UnicodeDecoder(),
-    ])
+    ]
     
-    if log_format.lower() == "json":
-        processors.append(structlog.processors.JSONRenderer())
+    log_level_obj = getattr(logging, log_level.upper(), logging.INFO)
+    service_log_file = None
+    if enable_file_logging:
+        service_log_file = log_path / f"{service_name}_{datetime.utcnow().strftime('%Y%m%d')}.log"
+    
+    if json_format:
+        # Our own events bypass stdlib logging and are written as raw bytes
+        processors.append(make_json_bytes_renderer(service_name, version))
+        logger_factory = structlog.BytesLoggerFactory(file=_open_json_sink(service_log_file))
+        stdlib_log_file = None
     else:
         processors.extend([
             structlog.dev.ConsoleRenderer(colors=True),
         ])
+        logger_factory = LoggerFactory()
+        stdlib_log_file = service_log_file
     
     structlog.configure(
         processors=processors,
-        wrapper_class=structlog.stdlib.BoundLogger,
-        logger_factory=LoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(log_level_obj),
+        logger_factory=logger_factory,
         cache_logger_on_first_use=True,
     )
     
-    log_level_obj = getattr(logging, log_level.upper(), logging.INFO)
-    
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level_obj)
     
     handlers = [console_handler]
     
-    if enable_file_logging:
-        service_log_file = log_path / f"{service_name}_{datetime.utcnow().strftime('%Y%m%d')}.log"
-        file_handler = logging.FileHandler(service_log_file)
+    if stdlib_log_file:
+        file_handler = logging.FileHandler(stdlib_log_file)
         file_handler.setLevel(log_level_obj)
         handlers.append(file_handler)
     
@@ -110,12 +134,30 @@ def configure_enhanced_logging(
     return error_tracker
 
 
+def _open_json_sink(service_log_file: Optional[Path]) -> BinaryIO:
+    """Open the binary stream JSON log lines are written to, reusing the current log file"""
+    global _json_log_file
+    if _json_log_file is not None and (
+        service_log_file is None or Path(_json_log_file.name) != service_log_file
+    ):
+        _json_log_file.close()
+        _json_log_file = None
+    if service_log_file is None:
+        return sys.stdout.buffer
+    if _json_log_file is None:
+        _json_log_file = open(service_log_file, "ab")
+    return _TeeBinaryFile([sys.stdout.buffer, _json_log_file])
+
+
 def _suppress_noisy_loggers():
-    """Suppress noisy third-party loggers"""
-    noisy_loggers = [
-        'discord', 'aiohttp', 'urllib3', 'chromadb', 'httpx',
-        'langchain', 'google', 'openai', 'anthropic'
-    ]
-    
-    for logger_name in noisy_loggers:
-        logging.getLogger(logger_name).setLevel(logging.WARNING)
\ No newline at end of file
+    """Suppress noisy third-party loggers, silencing them fully when SUPPRESS_NOISY_LOGS=1"""
+    silence = os.getenv("SUPPRESS_NOISY_LOGS") == "1"
+    for logger_name in _NOISY_LOGGERS:
+        noisy_logger = logging.getLogger(logger_name)
+        noisy_logger.setLevel(logging.WARNING)
+        if silence:
+            # Records stop at this logger instead of being formatted by the root handlers
+            noisy_logger.propagate = False
+            if not any(isinstance(h, logging.NullHandler) for h in noisy_logger.handlers):
+                noisy_logger.addHandler(logging.NullHandler())
+            noisy_logger.disabled = logger_name in _VERY_NOISY_LOGGERS
\ No newline at end of file
@@ -4,24 +4,25 @@ Performance monitoring and error handling
 """
 
 import structlog
-import traceback
-from datetime import datetime
+import time
 from typing import Dict, Any, Optional
 
+from .tracking import ErrorTracker
 from .utils import get_logger, log_exception, create_request_logger
 
 
 class LoggingMiddleware:
     """Middleware for request/response logging"""
     
-    def __init__(self, service_name: str):
+    def __init__(self, service_name: str, error_tracker: Optional[ErrorTracker] = None):
         self.service_name = service_name
+        self.error_tracker = error_tracker
         self.logger = get_logger(f"{service_name}.middleware")
     
     async def __call__(self, request, call_next):
         """Log request/response with timing"""
-        start_time = datetime.utcnow()
-        request_id = f"req_{start_time.timestamp()}"
+        start_ns = time.monotonic_ns()
+        request_id = f"req_{start_ns:x}"
         
         request_logger = create_request_logger(request_id)
         
@@ -35,7 +36,7 @@ class LoggingMiddleware:
         try:
             response = await call_next(request)
             
-            duration = (datetime.utcnow() - start_time).total_seconds() * 1000
+            duration = (time.monotonic_ns() - start_ns) / 1e6
             
             request_logger.info(
                 "Request completed",
@@ -47,14 +48,23 @@ class LoggingMiddleware:
             return response
             
         except Exception as exc:
-            duration = (datetime.utcnow() - start_time).total_seconds() * 1000
+            duration = (time.monotonic_ns() - start_ns) / 1e6
             
-            log_exception(
-                request_logger,
-                exc,
-                {"request_id": request_id, "duration": duration},
-                "ERROR"
-            )
+            context = {"request_id": request_id, "duration": duration}
+            
+            if self.error_tracker is None:
+                log_exception(request_logger, exc, context, "ERROR")
+            else:
+                # Record on the tracker's IO executor; the log line must not count it again
+                await self.error_tracker.track_error_async(type(exc).__name__, str(exc), context, "ERROR")
+                request_logger.error(
+                    "Request failed",
+                    error_type=type(exc).__name__,
+                    error_message=str(exc),
+                    context=context,
+                    exc_info=exc,
+                    error_tracked=True
+                )
             
             raise
 
@@ -3,71 +3,112 @@ Log processors for structured logging
 Context enrichment and formatting processors
 """
 
+import json
 import os
+import orjson
 import structlog
 from typing import Any, Dict
 
+_RESERVED_EVENT_KEYS = frozenset({
+    "event", "level", "timestamp", "logger", "exception", "exc_info", "stack_info"
+})
+
 
 def add_service_context(service_name: str, version: str = "1.0.0"):
     """Create service context processor"""
+    environment = os.environ.get("ENVIRONMENT", "development")
+    hostname = os.environ.get("HOSTNAME", "unknown")
+    
     def processor(logger, name, event_dict):
         event_dict["service"] = service_name
         event_dict["version"] = version
-        event_dict["environment"] = os.getenv("ENVIRONMENT", "development")
-        event_dict["hostname"] = os.getenv("HOSTNAME", "unknown")
+        event_dict["environment"] = environment
+        event_dict["hostname"] = hostname
         return event_dict
     return processor
 
 
-def add_error_tracking_processor(error_tracker):
-    """Create error tracking processor"""
-    def processor(logger, name, event_dict):
-        level = event_dict.get("level", "").upper()
-        if level in ["ERROR", "CRITICAL"]:
-            error_type = event_dict.get("error_type", type(event_dict.get("exception", Exception())).__name__)
-            error_msg = event_dict.get("event", str(event_dict.get("exception", "Unknown error")))
-            context = {k: v for k, v in event_dict.items() 
-                      if k not in ["event", "level", "timestamp", "logger", "exception"]}
-            
-            error_tracker.track_error(error_type, error_msg, context, level)
-        
-        return event_dict
-    return processor
+def dumps_json(obj: Any) -> bytes:
+    """Serialize obj with orjson, falling back to json for values orjson rejects (e.g. ints over 64 bits)"""
+    try:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return json.dumps(obj, default=str, separators=(",", ":")).encode()
+
+
+_REQUEST_CONTEXT_KEYS = frozenset({"request_id", "user_id", "trace_id"})
+_SERVICE_CONTEXT_KEYS = frozenset({"service", "version", "environment", "hostname"})
+_render_stack_info = structlog.processors.StackInfoRenderer()
+_ERROR_LEVELS = {"error": "ERROR", "exception": "ERROR", "critical": "CRITICAL"}
 
 
-def add_request_context_processor():
-    """Add request-specific context processor"""
+def add_fused_context_processor(
+    service_name: str,
+    version: str = "1.0.0",
+    error_tracker=None,
+    enable_performance_tracking: bool = True,
+    include_service_context: bool = True
+):
+    """Create one processor doing the work of the context, error and performance processors
+
+    Pass include_service_context=False when the renderer adds the service
+    fields itself, as make_json_bytes_renderer does.
+    """
+    environment = os.environ.get("ENVIRONMENT", "development")
+    hostname = os.environ.get("HOSTNAME", "unknown")
+    
     def processor(logger, name, event_dict):
-        request_id = structlog.contextvars.get_contextvars().get("request_id")
-        if request_id:
-            event_dict["request_id"] = request_id
+        for key, value in structlog.contextvars.get_contextvars().items():
+            if value and key in _REQUEST_CONTEXT_KEYS:
+                event_dict[key] = value
+            else:
+                event_dict.setdefault(key, value)
+        
+        if include_service_context:
+            event_dict["service"] = service_name
+            event_dict["version"] = version
+            event_dict["environment"] = environment
+            event_dict["hostname"] = hostname
+        
+        level = _ERROR_LEVELS.get(name)
+        if error_tracker is not None and level and not event_dict.get("error_tracked"):
+            error_type = event_dict.get("error_type", type(event_dict.get("exception", Exception())).__name__)
+            error_msg = event_dict.get("event", str(event_dict.get("exception", "Unknown error")))
+            error_tracker.track_error(error_type, error_msg, event_dict, level, _RESERVED_EVENT_KEYS)
         
-        user_id = structlog.contextvars.get_contextvars().get("user_id")
-        if user_id:
-            event_dict["user_id"] = user_id
+        if enable_performance_tracking:
+            if "duration" in event_dict:
+                duration = event_dict["duration"]
+                event_dict["performance"] = {"duration_ms": duration, "slow_query": duration > 1000}
+            if "memory_usage" in event_dict:
+                memory = event_dict["memory_usage"]
+                event_dict["resource_usage"] = {"memory_mb": memory, "high_memory": memory > 500}
         
-        trace_id = structlog.contextvars.get_contextvars().get("trace_id")
-        if trace_id:
-            event_dict["trace_id"] = trace_id
+        # Only exception and stack_info events pay for traceback rendering
+        if "exc_info" in event_dict:
+            event_dict = structlog.processors.format_exc_info(logger, name, event_dict)
+        if "stack_info" in event_dict:
+            event_dict = _render_stack_info(logger, name, event_dict)
         
         return event_dict
     return processor
 
 
-def add_performance_tracking_processor():
-    """Add performance tracking processor"""
-    def processor(logger, name, event_dict):
-        if "duration" in event_dict:
-            event_dict["performance"] = {
-                "duration_ms": event_dict["duration"],
-                "slow_query": event_dict["duration"] > 1000
-            }
-        
-        if "memory_usage" in event_dict:
-            event_dict["resource_usage"] = {
-                "memory_mb": event_dict["memory_usage"],
-                "high_memory": event_dict["memory_usage"] > 500
-            }
-        
-        return event_dict
-    return processor
\ No newline at end of file
+def make_json_bytes_renderer(service_name: str, version: str = "1.0.0"):
+    """Create a JSON bytes renderer with the fixed service fields serialized once"""
+    prefix = orjson.dumps({
+        "service": service_name,
+        "version": version,
+        "environment": os.environ.get("ENVIRONMENT", "development"),
+        "hostname": os.environ.get("HOSTNAME", "unknown"),
+    })[:-1]
+    empty = prefix + b"}"
+    
+    def renderer(logger, name, event_dict) -> bytes:
+        if not _SERVICE_CONTEXT_KEYS.isdisjoint(event_dict):
+            for key in _SERVICE_CONTEXT_KEYS:
+                event_dict.pop(key, None)
+        if not event_dict:
+            return empty
+        return prefix + b"," + dumps_json(event_dict)[1:]
+    return renderer
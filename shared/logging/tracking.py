@@ -3,10 +3,52 @@ Error tracking and aggregation for monitoring
 Performance and health metrics collection
 """
 
-import json
-from datetime import datetime
+import asyncio
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import AbstractSet, Deque, Dict, Any, List, Optional, Tuple
+
+import orjson
+
+from .processors import dumps_json
+
+_FLUSH_INTERVAL_SECONDS = 0.05
+_FLUSH_BATCH_SIZE = 256
+_MAX_ERROR_KEYS = 10_000
+
+_TS_CACHE = [0, ""]
+
+ErrorKey = Tuple[str, str]
+
+
+def _now_iso() -> str:
+    """Return the current UTC time as ISO 8601, formatted at most once per second"""
+    now = int(time.time())
+    if now != _TS_CACHE[0]:
+        _TS_CACHE[0] = now
+        _TS_CACHE[1] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+    return _TS_CACHE[1]
+
+
+def _open_append(path: Path) -> int:
+    """Open a raw fd whose writes always land at the end of the file"""
+    return os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+
+def _write_once(path: Path, payload: bytes):
+    """Append a single entry to a file, opening and closing it around the write"""
+    fd = _open_append(path)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
 
 
 class ErrorTracker:
@@ -16,73 +58,231 @@ class ErrorTracker:
         self.service_name = service_name
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
-        self.error_counts = {}
+        self.error_counts: "OrderedDict[ErrorKey, int]" = OrderedDict()
+        self._total_errors = 0
+        self._critical_count = 0
+        self._timeout_count = 0
+        self._connection_count = 0
+        # Alert counter each classified key was added to, so eviction can undo it
+        self._error_classes: Dict[ErrorKey, str] = {}
+        self._count_lock = threading.Lock()
         self.alert_thresholds = {
             "error_rate_5min": 10,
             "critical_error_count": 5,
             "timeout_count": 3
         }
+        self._error_fd: Optional[int] = None
+        self._error_fd_date: Optional[date] = None
+        self._current_log = self._error_log_path(datetime.utcnow().date())
+        self._alert_fd: Optional[int] = None
+        self._queue: Deque[bytes] = deque()
+        self._queue_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._closed = False
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="errlog")
+        self._drain_thread = threading.Thread(
+            target=self._drain_loop, name=f"{service_name}-error-log", daemon=True
+        )
+        self._drain_thread.start()
+        atexit.register(self.close)
     
-    def track_error(self, error_type: str, error_msg: str, context: Dict[str, Any] = None, severity: str = "ERROR"):
-        """Track an error for monitoring purposes"""
-        error_key = f"{error_type}:{error_msg[:100]}"
-        self.error_counts[error_key] = self.error_counts.get(error_key, 0) + 1
-        
-        error_log_file = self.log_dir / f"errors_{datetime.utcnow().strftime('%Y%m%d')}.json"
+    def track_error(
+        self,
+        error_type: str,
+        error_msg: str,
+        context: Dict[str, Any] = None,
+        severity: str = "ERROR",
+        exclude_keys: AbstractSet[str] = frozenset()
+    ):
+        """Track an error for monitoring purposes, omitting exclude_keys from the context"""
+        error_key = (sys.intern(error_type), error_msg[:100])
+        count = self._count_error_key(error_key, error_type, severity)
         
         error_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _now_iso(),
             "service": self.service_name,
             "error_type": error_type,
             "error_message": error_msg,
             "severity": severity,
-            "count": self.error_counts[error_key],
-            "context": context or {}
+            "count": count,
+            "context": {k: v for k, v in context.items() if k not in exclude_keys} if context else {}
         }
         
-        with open(error_log_file, "a") as f:
-            f.write(json.dumps(error_entry) + "\n")
+        self._enqueue(dumps_json(error_entry) + b"\n")
         
         self._check_alert_thresholds(error_type, severity)
     
+    async def track_error_async(
+        self,
+        error_type: str,
+        error_msg: str,
+        context: Dict[str, Any] = None,
+        severity: str = "ERROR",
+        exclude_keys: AbstractSet[str] = frozenset()
+    ):
+        """Track an error from async code without blocking the event loop"""
+        if self._closed:
+            self.track_error(error_type, error_msg, context, severity, exclude_keys)
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, self.track_error, error_type, error_msg, context, severity, exclude_keys
+        )
+    
+    def _count_error_key(self, error_key: ErrorKey, error_type: str, severity: str) -> int:
+        """Increment and return the count for an error key, evicting the least recently seen key when full"""
+        with self._count_lock:
+            count = self.error_counts.get(error_key)
+            if count is None:
+                self._classify_new_error(error_key, error_type, severity)
+                count = 0
+            else:
+                self.error_counts.move_to_end(error_key)
+            self.error_counts[error_key] = count + 1
+            self._total_errors += 1
+            if len(self.error_counts) > _MAX_ERROR_KEYS:
+                evicted_key, _ = self.error_counts.popitem(last=False)
+                counter = self._error_classes.pop(evicted_key, None)
+                if counter:
+                    setattr(self, counter, getattr(self, counter) - 1)
+            return count + 1
+    
+    def _classify_new_error(self, error_key: ErrorKey, error_type: str, severity: str):
+        """Update the alert counters for a newly seen error key; callers hold _count_lock"""
+        if severity == "CRITICAL":
+            counter = "_critical_count"
+        elif "TimeoutError" in error_type:
+            counter = "_timeout_count"
+        elif "ConnectionError" in error_type:
+            counter = "_connection_count"
+        else:
+            return
+        setattr(self, counter, getattr(self, counter) + 1)
+        self._error_classes[error_key] = counter
+    
     def _check_alert_thresholds(self, error_type: str, severity: str):
         """Check if error patterns trigger alerts"""
         if severity == "CRITICAL":
-            critical_count = sum(1 for k in self.error_counts.keys() 
-                               if "CRITICAL" in k or "TimeoutError" in k or "ConnectionError" in k)
+            critical_count = self._critical_count + self._timeout_count + self._connection_count
             if critical_count >= self.alert_thresholds["critical_error_count"]:
                 self._trigger_alert("CRITICAL", f"Critical error threshold exceeded: {critical_count} errors")
     
     def _trigger_alert(self, level: str, message: str):
         """Trigger monitoring alert"""
-        alert_file = self.log_dir / "alerts.json"
-        
         alert = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _now_iso(),
             "service": self.service_name,
             "level": level,
             "message": message,
-            "alert_id": f"alert_{datetime.utcnow().timestamp()}"
+            "alert_id": f"alert_{time.monotonic_ns()}"
         }
         
-        with open(alert_file, "a") as f:
-            f.write(json.dumps(alert) + "\n")
+        payload = orjson.dumps(alert) + b"\n"
+        with self._write_lock:
+            if self._closed:
+                _write_once(self.log_dir / "alerts.json", payload)
+            else:
+                os.write(self._get_alert_fd(), payload)
+    
+    def _enqueue(self, payload: bytes):
+        """Queue a serialized entry for the background writer, or write it directly once closed"""
+        with self._queue_lock:
+            closed = self._closed
+            if not closed:
+                self._queue.append(payload)
+                pending = len(self._queue)
+        if closed:
+            with self._write_lock:
+                _write_once(self._error_log_path(datetime.utcnow().date()), payload)
+            return
+        if pending >= _FLUSH_BATCH_SIZE:
+            self._flush_requested.set()
+    
+    def _drain_loop(self):
+        """Write queued entries in batches until the tracker is closed"""
+        while not self._closed:
+            self._flush_requested.wait(_FLUSH_INTERVAL_SECONDS)
+            self._flush_requested.clear()
+            self.flush()
+    
+    def flush(self):
+        """Write all queued error entries to the daily error log in one call"""
+        with self._write_lock:
+            with self._queue_lock:
+                if not self._queue:
+                    return
+                blob = b"".join(self._queue)
+                self._queue.clear()
+            os.write(self._get_error_fd(), blob)
+    
+    @property
+    def current_log_path(self) -> Path:
+        """Path of the daily error log entries are currently written to"""
+        return self._current_log
+    
+    def _error_log_path(self, day: date) -> Path:
+        """Return the error log path for the given UTC date"""
+        return self.log_dir / f"errors_{day.strftime('%Y%m%d')}.json"
+    
+    def _get_error_fd(self) -> int:
+        """Return the fd for today's error log, rolling over when the UTC date changes"""
+        today = datetime.utcnow().date()
+        if self._error_fd_date != today:
+            if self._error_fd is not None:
+                os.close(self._error_fd)
+            self._current_log = self._error_log_path(today)
+            self._error_fd = _open_append(self._current_log)
+            self._error_fd_date = today
+        return self._error_fd
+    
+    def _get_alert_fd(self) -> int:
+        """Return the fd for the alert log; callers hold _write_lock"""
+        if self._alert_fd is None:
+            self._alert_fd = _open_append(self.log_dir / "alerts.json")
+        return self._alert_fd
+    
+    def close(self):
+        """Stop the background writer, flush queued entries and close the log files
+        
+        Errors tracked afterwards are written straight to the log files, one open per entry.
+        """
+        atexit.unregister(self.close)
+        with self._queue_lock:
+            self._closed = True
+        self._io_executor.shutdown(wait=True)
+        self._flush_requested.set()
+        if self._drain_thread.is_alive() and self._drain_thread is not threading.current_thread():
+            self._drain_thread.join()
+        self.flush()
+        with self._write_lock:
+            for fd in (self._error_fd, self._alert_fd):
+                if fd is not None:
+                    os.close(fd)
+            self._error_fd = None
+            self._error_fd_date = None
+            self._alert_fd = None
 
 
 def get_service_health_metrics(error_tracker: ErrorTracker = None) -> Dict[str, Any]:
     """Get service health metrics for monitoring"""
     metrics = {
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _now_iso(),
         "uptime_seconds": "TODO: implement uptime tracking",
         "memory_usage_mb": "TODO: implement memory tracking",
         "active_connections": "TODO: implement connection tracking"
     }
     
     if error_tracker:
+        with error_tracker._count_lock:
+            error_counts = list(error_tracker.error_counts.items())
+            total_errors = error_tracker._total_errors
         metrics.update({
-            "error_counts": error_tracker.error_counts.copy(),
-            "total_errors": sum(error_tracker.error_counts.values()),
-            "unique_errors": len(error_tracker.error_counts),
+            "error_counts": {
+                f"{error_type}:{error_msg}": count
+                for (error_type, error_msg), count in error_counts
+            },
+            "total_errors": total_errors,
+            "unique_errors": len(error_counts),
             "service": error_tracker.service_name
         })
     
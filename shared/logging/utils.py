@@ -4,7 +4,6 @@ Logger creation and exception handling
 """
 
 import structlog
-import traceback
 from typing import Dict, Any, Optional
 
 
@@ -17,18 +16,18 @@ def log_exception(
     logger: structlog.BoundLogger, 
     exc: Exception, 
     context: Dict[str, Any] = None,
-    severity: str = "ERROR"
+    severity: str = "ERROR",
+    with_stack: bool = False
 ):
-    """Log an exception with full context and tracking"""
+    """Log an exception with full context and tracking, optionally with the calling stack"""
     logger.error(
         "Exception occurred",
         error_type=type(exc).__name__,
         error_message=str(exc),
         severity=severity,
-        traceback=traceback.format_exc(),
         context=context or {},
-        exception=exc,
-        exc_info=True
+        exc_info=exc,
+        stack_info=with_stack
     )
 
 
@@ -40,13 +39,13 @@ def create_request_logger(
     """Create a logger with request context"""
     logger = structlog.get_logger()
     
-    structlog.contextvars.clear_contextvars()
-    structlog.contextvars.bind_contextvars(request_id=request_id)
-    
+    context = {"request_id": request_id}
     if user_id:
-        structlog.contextvars.bind_contextvars(user_id=user_id)
-    
+        context["user_id"] = user_id
     if trace_id:
-        structlog.contextvars.bind_contextvars(trace_id=trace_id)
+        context["trace_id"] = trace_id
+    
+    structlog.contextvars.clear_contextvars()
+    structlog.contextvars.bind_contextvars(**context)
     
     return logger
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Shared pytest configuration for WoW Actuality Bot tests
+Command line options and fixtures used across test modules
+"""
+
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+import pytest_asyncio
+
+pytest_plugins = ("pytester",)
+
+API_BASE_URL = "http://localhost:8000"
+
+_API_HEALTHY = pytest.StashKey[bool]()
+
+E2E_SKIPFILE = Path(__file__).parent / ".e2e-skipfile"
+
+
+def pytest_addoption(parser):
+    """Register test suite command line options"""
+    parser.addoption(
+        "--load-requests",
+        action="store",
+        type=int,
+        default=10,
+        help="Number of concurrent requests issued per batch by the API and E2E load tests"
+    )
+    parser.addoption(
+        "--force-health-recheck",
+        action="store_true",
+        default=False,
+        help="Probe service health before every end-to-end test, bypassing the once-per-session and cross-run health caches"
+    )
+    parser.addoption(
+        "--retry-timed-out",
+        action="store_true",
+        default=False,
+        help="Run end-to-end tests listed in the timeout skipfile instead of skipping them"
+    )
+
+
+def _api_is_healthy(config: pytest.Config) -> bool:
+    """Probe the API health endpoint once per run, caching the answer on the config"""
+    if _API_HEALTHY not in config.stash:
+        try:
+            response = httpx.get(f"{API_BASE_URL}/health", timeout=2.0)
+            config.stash[_API_HEALTHY] = response.status_code == 200
+        except httpx.HTTPError:
+            config.stash[_API_HEALTHY] = False
+    return config.stash[_API_HEALTHY]
+
+
+def _timed_out_nodeids() -> set:
+    """Node ids of e2e tests that hit their timeout on an earlier run"""
+    if not E2E_SKIPFILE.exists():
+        return set()
+    return set(E2E_SKIPFILE.read_text().split())
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    """Skip every selected e2e test up front when the API service is down or it timed out before"""
+    e2e_items = [item for item in items if item.get_closest_marker("e2e")]
+    if not e2e_items:
+        return
+    if not _api_is_healthy(config):
+        skip_e2e = pytest.mark.skip(reason="API service not available")
+        for item in e2e_items:
+            item.add_marker(skip_e2e)
+        return
+    if config.getoption("--retry-timed-out"):
+        return
+    timed_out = _timed_out_nodeids()
+    skip_timed_out = pytest.mark.skip(reason=f"Timed out on a previous run (see {E2E_SKIPFILE.name})")
+    for item in e2e_items:
+        if item.nodeid in timed_out:
+            item.add_marker(skip_timed_out)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Record e2e tests killed by pytest-timeout so later runs skip them"""
+    report = yield
+    if (
+        report.when == "call"
+        and report.failed
+        and item.get_closest_marker("e2e")
+        and "from pytest-timeout" in report.longreprtext
+        and item.nodeid not in _timed_out_nodeids()
+    ):
+        with E2E_SKIPFILE.open("a") as skipfile:
+            skipfile.write(f"{item.nodeid}\n")
+    return report
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run async tests on uvloop when it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.DefaultEventLoopPolicy()
+    return uvloop.EventLoopPolicy()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def api_client():
+    """Shared client for the running API service, probed once per session"""
+    async with httpx.AsyncClient(base_url=API_BASE_URL, timeout=30.0) as client:
+        try:
+            response = await client.get("/health")
+            response.raise_for_status()
+        except httpx.HTTPError:
+            pytest.skip("API service not available for integration test")
+        yield client
@@ -5,8 +5,11 @@ Tests for logging utilities, middleware, and error tracking
 
 import pytest
 import json
-import tempfile
+import logging
+import orjson
 import structlog
+from structlog.testing import LogCapture
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime
 from pathlib import Path
@@ -21,6 +24,38 @@ from shared.logging import (
     ErrorTracker,
     get_service_health_metrics
 )
+from shared.logging.config import _NOISY_LOGGERS, _open_json_sink, _suppress_noisy_loggers
+from shared.logging.processors import (
+    add_fused_context_processor,
+    add_service_context,
+    make_json_bytes_renderer
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _structlog_once(tmp_path_factory):
+    """Configure structlog once for the whole test session"""
+    configure_enhanced_logging(
+        "test-suite",
+        log_level="WARNING",
+        log_dir=str(tmp_path_factory.mktemp("logs")),
+        enable_file_logging=False,
+        enable_error_tracking=False
+    )
+
+
+@pytest.fixture
+def cap_logs():
+    """Capture structlog events as plain dicts, restoring the configuration afterwards"""
+    cap = LogCapture()
+    old_config = structlog.get_config()
+    structlog.configure(
+        processors=[cap],
+        wrapper_class=structlog.make_filtering_bound_logger(logging.DEBUG),
+        cache_logger_on_first_use=False
+    )
+    yield cap.entries
+    structlog.configure(**old_config)
 
 
 class TestLoggingUtils:
@@ -28,34 +63,42 @@ class TestLoggingUtils:
     
     def test_get_logger_returns_structured_logger(self):
         """Test logger creation returns structlog instance"""
-        logger = get_logger("test-service")
-        assert isinstance(logger, structlog.BoundLogger)
+        logger = get_logger("test-service").bind()
+        assert isinstance(logger, structlog.BoundLoggerBase)
     
-    def test_log_exception_captures_error_details(self):
+    def test_log_exception_captures_error_details(self, cap_logs):
         """Test exception logging includes all error context"""
-        logger = Mock()
         test_exception = ValueError("Test error")
         context = {"user_id": "123", "action": "test"}
         
-        log_exception(logger, test_exception, context, "CRITICAL")
+        log_exception(structlog.get_logger(), test_exception, context, "CRITICAL")
         
-        logger.error.assert_called_once()
-        call_args = logger.error.call_args
-        assert call_args[0][0] == "Exception occurred"
-        assert call_args[1]["error_type"] == "ValueError"
-        assert call_args[1]["error_message"] == "Test error"
-        assert call_args[1]["severity"] == "CRITICAL"
-        assert call_args[1]["context"] == context
+        assert len(cap_logs) == 1
+        entry = cap_logs[0]
+        assert entry["event"] == "Exception occurred"
+        assert entry["log_level"] == "error"
+        assert entry["error_type"] == "ValueError"
+        assert entry["error_message"] == "Test error"
+        assert entry["severity"] == "CRITICAL"
+        assert entry["context"] == context
+        assert entry["exc_info"] is test_exception
+        assert entry["stack_info"] is False
     
     def test_create_request_logger_binds_context(self):
         """Test request logger binds context variables"""
         with patch('structlog.contextvars.bind_contextvars') as mock_bind:
             logger = create_request_logger("req-123", "user-456", "trace-789")
             
-            assert mock_bind.call_count == 3
-            mock_bind.assert_any_call(request_id="req-123")
-            mock_bind.assert_any_call(user_id="user-456")
-            mock_bind.assert_any_call(trace_id="trace-789")
+            mock_bind.assert_called_once_with(
+                request_id="req-123", user_id="user-456", trace_id="trace-789"
+            )
+    
+    def test_create_request_logger_skips_missing_ids(self):
+        """Test optional user and trace IDs are not bound when absent"""
+        with patch('structlog.contextvars.bind_contextvars') as mock_bind:
+            create_request_logger("req-123")
+            
+            mock_bind.assert_called_once_with(request_id="req-123")
 
 
 class TestLoggingMiddleware:
@@ -85,72 +128,359 @@ class TestLoggingMiddleware:
             
             assert response == mock_response
             assert mock_logger.info.call_count == 2  # Start and complete
+            request_id = mock_logger_creator.call_args[0][0]
+            assert request_id.startswith("req_")
+            int(request_id[len("req_"):], 16)
+    
+    @pytest.mark.asyncio
+    async def test_middleware_logs_exception_without_tracker(self):
+        """Test failed requests are logged through log_exception and re-raised"""
+        middleware = LoggingMiddleware("test-service")
+        
+        async def failing_call_next(request):
+            raise ValueError("boom")
+        
+        with patch('shared.logging.middleware.create_request_logger'), \
+                patch('shared.logging.middleware.log_exception') as mock_log_exception:
+            with pytest.raises(ValueError):
+                await middleware(Mock(), failing_call_next)
+            
+            mock_log_exception.assert_called_once()
+            exc = mock_log_exception.call_args[0][1]
+            assert str(exc) == "boom"
     
-    def test_log_performance_metric_formats_correctly(self):
+    @pytest.mark.asyncio
+    async def test_middleware_tracks_exception_through_tracker(self, error_tracker):
+        """Test failed requests are tracked once via track_error_async and re-raised"""
+        middleware = LoggingMiddleware("test-service", error_tracker)
+        
+        async def failing_call_next(request):
+            raise ValueError("boom")
+        
+        with patch('shared.logging.middleware.create_request_logger') as mock_logger_creator:
+            with pytest.raises(ValueError):
+                await middleware(Mock(), failing_call_next)
+        error_tracker.close()
+        
+        assert error_tracker.error_counts == {("ValueError", "boom"): 1}
+        assert mock_logger_creator.return_value.error.call_args[1]["error_tracked"] is True
+    
+    def test_log_performance_metric_formats_correctly(self, cap_logs):
         """Test performance metric logging format"""
-        logger = Mock()
         metadata = {"query": "test", "rows": 10}
         
-        log_performance_metric(logger, "db_query", 1500.5, True, metadata)
+        log_performance_metric(structlog.get_logger(), "db_query", 1500.5, True, metadata)
         
-        logger.info.assert_called_once_with(
-            "Performance metric",
-            operation="db_query",
-            duration=1500.5,
-            success=True,
-            slow_query=True,
-            metadata=metadata
-        )
+        assert cap_logs == [{
+            "event": "Performance metric",
+            "log_level": "info",
+            "operation": "db_query",
+            "duration": 1500.5,
+            "success": True,
+            "slow_query": True,
+            "metadata": metadata
+        }]
+
+
+@pytest.fixture
+def error_tracker(tmp_path):
+    """ErrorTracker writing into the test's own tmp_path, closed after the test"""
+    tracker = ErrorTracker("test-service", str(tmp_path))
+    yield tracker
+    tracker.close()
 
 
 class TestErrorTracker:
     """Test error tracking and aggregation"""
     
-    def test_error_tracker_initialization(self):
+    def test_error_tracker_initialization(self, error_tracker, tmp_path):
         """Test error tracker setup"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            tracker = ErrorTracker("test-service", temp_dir)
-            
-            assert tracker.service_name == "test-service"
-            assert tracker.log_dir == Path(temp_dir)
-            assert len(tracker.error_counts) == 0
+        assert error_tracker.service_name == "test-service"
+        assert error_tracker.log_dir == tmp_path
+        assert len(error_tracker.error_counts) == 0
     
-    def test_track_error_creates_log_entry(self):
+    def test_track_error_creates_log_entry(self, error_tracker):
         """Test error tracking creates proper log entry"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            tracker = ErrorTracker("test-service", temp_dir)
-            context = {"user_id": "123"}
-            
-            tracker.track_error("ValueError", "Test error", context, "ERROR")
-            
-            # Check error count updated
-            error_key = "ValueError:Test error"
-            assert tracker.error_counts[error_key] == 1
-            
-            # Check log file created
-            log_files = list(Path(temp_dir).glob("errors_*.json"))
-            assert len(log_files) == 1
-            
-            # Check log entry content
-            with open(log_files[0], 'r') as f:
-                log_entry = json.loads(f.read().strip())
-                assert log_entry["service"] == "test-service"
-                assert log_entry["error_type"] == "ValueError"
-                assert log_entry["context"] == context
-    
-    def test_get_service_health_metrics_format(self):
+        context = {"user_id": "123"}
+        
+        error_tracker.track_error("ValueError", "Test error", context, "ERROR")
+        error_tracker.close()
+        
+        # Check error count updated
+        error_key = ("ValueError", "Test error")
+        assert error_tracker.error_counts[error_key] == 1
+        
+        # Check log entry content
+        log_entry = orjson.loads(error_tracker.current_log_path.read_bytes().splitlines()[0])
+        assert log_entry["service"] == "test-service"
+        assert log_entry["error_type"] == "ValueError"
+        assert log_entry["context"] == context
+    
+    @pytest.mark.asyncio
+    async def test_track_error_async_counts_error(self, error_tracker, tmp_path):
+        """Test async error tracking records the error via the IO executor"""
+        await error_tracker.track_error_async("ValueError", "Async error", {"user_id": "123"})
+        error_tracker.close()
+        
+        assert error_tracker.error_counts[("ValueError", "Async error")] == 1
+        log_file = next(tmp_path.glob("errors_*.json"))
+        assert json.loads(log_file.read_text())["context"] == {"user_id": "123"}
+    
+    def test_track_error_reuses_daily_log_file(self, error_tracker, tmp_path):
+        """Test repeated errors are appended to a single daily log file"""
+        error_tracker.track_error("ValueError", "First error")
+        error_tracker.track_error("KeyError", "Second error")
+        error_tracker.close()
+        
+        log_files = list(tmp_path.glob("errors_*.json"))
+        assert len(log_files) == 1
+        assert len(log_files[0].read_text().splitlines()) == 2
+    
+    def test_flush_writes_queued_entries(self, error_tracker, tmp_path):
+        """Test queued error entries are written when flushed"""
+        error_tracker.track_error("ValueError", "Queued error")
+        error_tracker.flush()
+        
+        log_file = next(tmp_path.glob("errors_*.json"))
+        assert json.loads(log_file.read_text())["error_message"] == "Queued error"
+    
+    def test_track_error_after_close_is_written(self, error_tracker, tmp_path):
+        """Test errors tracked after close go straight to the daily log instead of being dropped"""
+        error_tracker.close()
+        error_tracker.track_error("ValueError", "Late error")
+        
+        log_file = next(tmp_path.glob("errors_*.json"))
+        assert json.loads(log_file.read_text())["error_message"] == "Late error"
+    
+    def test_close_releases_atexit_hook(self, error_tracker):
+        """Test closing a tracker unregisters its atexit hook so it can be freed"""
+        with patch("shared.logging.tracking.atexit.unregister") as unregister:
+            error_tracker.close()
+        
+        unregister.assert_called_once_with(error_tracker.close)
+    
+    def test_track_error_omits_excluded_context_keys(self, error_tracker, tmp_path):
+        """Test excluded keys are dropped from the logged context"""
+        event_dict = {"event": "boom", "user_id": "123"}
+        error_tracker.track_error("ValueError", "boom", event_dict, "ERROR", frozenset({"event"}))
+        error_tracker.close()
+        
+        log_file = next(tmp_path.glob("errors_*.json"))
+        assert json.loads(log_file.read_text())["context"] == {"user_id": "123"}
+        assert event_dict == {"event": "boom", "user_id": "123"}
+    
+    def test_track_error_logs_context_orjson_rejects(self, error_tracker, tmp_path):
+        """Test contexts with non-string keys or wide ints are still written"""
+        error_tracker.track_error("ValueError", "boom", {"by_status": {500: 1}, "big": 2 ** 70})
+        error_tracker.close()
+        
+        log_file = next(tmp_path.glob("errors_*.json"))
+        assert json.loads(log_file.read_text())["context"] == {"by_status": {"500": 1}, "big": 2 ** 70}
+    
+    def test_error_counts_evict_least_recent_key(self, error_tracker, monkeypatch):
+        """Test error counts stay bounded by evicting the least recently seen key"""
+        monkeypatch.setattr("shared.logging.tracking._MAX_ERROR_KEYS", 2)
+        
+        error_tracker.track_error("ValueError", "first")
+        error_tracker.track_error("ValueError", "second")
+        error_tracker.track_error("ValueError", "first")
+        error_tracker.track_error("ValueError", "third")
+        error_tracker.close()
+        
+        assert list(error_tracker.error_counts) == [("ValueError", "first"), ("ValueError", "third")]
+        assert get_service_health_metrics(error_tracker)["total_errors"] == 4
+        assert error_tracker.error_counts[("ValueError", "first")] == 2
+    
+    def test_evicted_keys_release_alert_counters(self, error_tracker, monkeypatch):
+        """Test evicting a classified key takes it out of the alert counters"""
+        monkeypatch.setattr("shared.logging.tracking._MAX_ERROR_KEYS", 2)
+        
+        error_tracker.track_error("RuntimeError", "down", severity="CRITICAL")
+        error_tracker.track_error("TimeoutError", "slow")
+        assert (error_tracker._critical_count, error_tracker._timeout_count) == (1, 1)
+        
+        error_tracker.track_error("ValueError", "first")
+        error_tracker.track_error("ValueError", "second")
+        error_tracker.close()
+        
+        assert (error_tracker._critical_count, error_tracker._timeout_count) == (0, 0)
+        assert not error_tracker._error_classes
+    
+    def test_concurrent_tracking_keeps_counts_consistent(self, error_tracker, monkeypatch):
+        """Test counting and eviction from many threads loses no increments"""
+        monkeypatch.setattr("shared.logging.tracking._MAX_ERROR_KEYS", 16)
+        
+        def track_many(worker):
+            for i in range(500):
+                error_tracker.track_error("ValueError", f"error {(worker + i) % 32}")
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(track_many, range(8)))
+        error_tracker.close()
+        
+        assert get_service_health_metrics(error_tracker)["total_errors"] == 4000
+        assert len(error_tracker.error_counts) == 16
+    
+    def test_critical_errors_trigger_alert_at_threshold(self, error_tracker, tmp_path):
+        """Test distinct critical errors raise an alert once the threshold is reached"""
+        for i in range(error_tracker.alert_thresholds["critical_error_count"]):
+            error_tracker.track_error("RuntimeError", f"failure {i}", severity="CRITICAL")
+        error_tracker.close()
+        
+        alerts = (tmp_path / "alerts.json").read_text().splitlines()
+        assert len(alerts) == 1
+        assert json.loads(alerts[0])["level"] == "CRITICAL"
+    
+    def test_get_service_health_metrics_format(self, error_tracker):
         """Test health metrics format and content"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            tracker = ErrorTracker("test-service", temp_dir)
-            tracker.error_counts = {"Error1": 5, "Error2": 3}
-            
-            metrics = get_service_health_metrics(tracker)
-            
-            assert metrics["service"] == "test-service"
-            assert metrics["total_errors"] == 8
-            assert metrics["unique_errors"] == 2
-            assert "timestamp" in metrics
-            assert "error_counts" in metrics
+        for _ in range(5):
+            error_tracker.track_error("Error1", "first")
+        for _ in range(3):
+            error_tracker.track_error("Error2", "second")
+        error_tracker.close()
+        
+        metrics = get_service_health_metrics(error_tracker)
+        
+        assert metrics["error_counts"] == {"Error1:first": 5, "Error2:second": 3}
+        assert metrics["service"] == "test-service"
+        assert metrics["total_errors"] == 8
+        assert metrics["unique_errors"] == 2
+        assert "timestamp" in metrics
+        assert "error_counts" in metrics
+
+
+class TestServiceContextProcessor:
+    """Test service metadata enrichment"""
+    
+    def test_environment_is_read_when_processor_is_created(self, monkeypatch):
+        """Test environment values are captured once instead of per event"""
+        monkeypatch.setenv("ENVIRONMENT", "staging")
+        processor = add_service_context("test-service", "2.0.0")
+        monkeypatch.setenv("ENVIRONMENT", "production")
+        
+        event = processor(None, "info", {"event": "hello"})
+        
+        assert event["environment"] == "staging"
+        assert event["service"] == "test-service"
+
+
+class TestFusedContextProcessor:
+    """Test the single-pass context processor"""
+    
+    def test_merges_request_context_and_service_fields(self):
+        """Test request context and service metadata are added to the event"""
+        processor = add_fused_context_processor("test-service", "2.0.0")
+        create_request_logger("req-1", "user-1")
+        
+        event = processor(None, "info", {"event": "hello", "duration": 1500})
+        structlog.contextvars.clear_contextvars()
+        
+        assert event["request_id"] == "req-1"
+        assert event["user_id"] == "user-1"
+        assert event["service"] == "test-service"
+        assert event["version"] == "2.0.0"
+        assert event["performance"] == {"duration_ms": 1500, "slow_query": True}
+    
+    def test_tracks_error_level_events_only(self):
+        """Test only error and critical events are sent to the error tracker"""
+        tracker = Mock()
+        processor = add_fused_context_processor("test-service", error_tracker=tracker)
+        
+        processor(None, "info", {"event": "fine"})
+        processor(None, "critical", {"event": "broken", "error_type": "ValueError"})
+        
+        tracker.track_error.assert_called_once()
+        error_type, error_msg, _, severity, _ = tracker.track_error.call_args[0]
+        assert (error_type, error_msg, severity) == ("ValueError", "broken", "CRITICAL")
+    
+    def test_skips_events_already_tracked(self):
+        """Test events flagged error_tracked are not sent to the tracker a second time"""
+        tracker = Mock()
+        processor = add_fused_context_processor("test-service", error_tracker=tracker)
+        
+        processor(None, "error", {"event": "Request failed", "error_tracked": True})
+        
+        tracker.track_error.assert_not_called()
+    
+    def test_exception_bookkeeping_keys_stay_out_of_error_context(self, tmp_path):
+        """Test exc_info and stack_info are not copied into the tracked error context"""
+        tracker = ErrorTracker("test-service", str(tmp_path))
+        processor = add_fused_context_processor("test-service", error_tracker=tracker)
+        try:
+            1 / 0
+        except ZeroDivisionError as exc:
+            processor(None, "error", {"event": "failed", "exc_info": exc, "stack_info": False, "user_id": "1"})
+        tracker.close()
+        
+        log_file = next(tmp_path.glob("errors_*.json"))
+        context = json.loads(log_file.read_text())["context"]
+        assert context["user_id"] == "1"
+        assert "exc_info" not in context
+        assert "stack_info" not in context
+    
+    def test_renders_traceback_only_for_exception_events(self):
+        """Test exc_info is rendered into an exception string when present"""
+        processor = add_fused_context_processor("test-service")
+        try:
+            raise ValueError("boom")
+        except ValueError as exc:
+            error = exc
+        
+        plain = processor(None, "info", {"event": "fine"})
+        failed = processor(None, "error", {"event": "failed", "exc_info": error})
+        
+        assert "exception" not in plain
+        assert "exc_info" not in failed
+        assert "ValueError: boom" in failed["exception"]
+    
+    def test_can_leave_service_fields_to_renderer(self):
+        """Test service metadata is skipped when the renderer adds it"""
+        processor = add_fused_context_processor("test-service", include_service_context=False)
+        
+        event = processor(None, "info", {"event": "hello"})
+        
+        assert "service" not in event
+        assert "hostname" not in event
+
+
+class TestJsonBytesRenderer:
+    """Test the JSON renderer with pre-serialized service fields"""
+    
+    def test_renders_service_fields_and_event(self, monkeypatch):
+        """Test rendered lines carry the static service fields and the event"""
+        monkeypatch.setenv("ENVIRONMENT", "staging")
+        renderer = make_json_bytes_renderer("test-service", "2.0.0")
+        
+        line = json.loads(renderer(None, "info", {"event": "hello", "count": 2}))
+        
+        assert line == {
+            "service": "test-service",
+            "version": "2.0.0",
+            "environment": "staging",
+            "hostname": line["hostname"],
+            "event": "hello",
+            "count": 2
+        }
+    
+    def test_renders_empty_event_and_drops_duplicate_service_keys(self):
+        """Test the output stays valid JSON without duplicated service keys"""
+        renderer = make_json_bytes_renderer("test-service")
+        
+        empty = renderer(None, "info", {})
+        overridden = renderer(None, "info", {"service": "other", "event": "hi"})
+        
+        assert json.loads(empty)["service"] == "test-service"
+        assert overridden.count(b'"service"') == 1
+        assert json.loads(overridden)["service"] == "test-service"
+    
+    def test_renders_non_str_keys_and_wide_ints(self):
+        """Test values orjson rejects by default still render as valid JSON"""
+        renderer = make_json_bytes_renderer("test-service")
+        
+        line = json.loads(renderer(None, "info", {"event": "hi", "by_status": {404: 3}, "big": 2 ** 70}))
+        
+        assert line["by_status"] == {"404": 3}
+        assert line["big"] == 2 ** 70
 
 
 class TestLoggingConfiguration:
@@ -164,4 +494,47 @@ class TestLoggingConfiguration:
             mock_configure.assert_called_once()
             call_args = mock_configure.call_args[1]
             assert "processors" in call_args
-            assert "logger_factory" in call_args
\ No newline at end of file
+            assert "logger_factory" in call_args
+    
+    def test_reconfigure_closes_previous_error_tracker(self, tmp_path):
+        """Test configuring again closes the error tracker the last call created"""
+        with patch('structlog.configure'):
+            first = configure_enhanced_logging("test-service", log_dir=str(tmp_path), enable_file_logging=False)
+            second = configure_enhanced_logging("test-service", log_dir=str(tmp_path), enable_file_logging=False)
+            configure_enhanced_logging(
+                "test-service", log_dir=str(tmp_path), enable_file_logging=False, enable_error_tracking=False
+            )
+        
+        assert first is not second
+        assert first._closed
+        assert second._closed
+    
+    def test_suppress_noisy_logs_silences_third_party_loggers(self, monkeypatch):
+        """Test SUPPRESS_NOISY_LOGS=1 stops noisy loggers from propagating"""
+        monkeypatch.setenv("SUPPRESS_NOISY_LOGS", "1")
+        discord_logger = logging.getLogger("discord")
+        httpx_logger = logging.getLogger("httpx")
+        try:
+            _suppress_noisy_loggers()
+            
+            assert discord_logger.disabled
+            assert not httpx_logger.disabled
+            assert not httpx_logger.propagate
+            assert any(isinstance(h, logging.NullHandler) for h in httpx_logger.handlers)
+        finally:
+            for logger_name in _NOISY_LOGGERS:
+                noisy_logger = logging.getLogger(logger_name)
+                noisy_logger.disabled = False
+                noisy_logger.propagate = True
+                noisy_logger.handlers.clear()
+    
+    def test_json_sink_reuses_log_file_across_reconfigure(self, tmp_path):
+        """Test reconfiguring with the same log file reuses one handle and releases it afterwards"""
+        log_file = tmp_path / "test-service.log"
+        first = _open_json_sink(log_file)
+        second = _open_json_sink(log_file)
+        
+        assert first._streams[1] is second._streams[1]
+        
+        _open_json_sink(None)
+        assert second._streams[1].closed